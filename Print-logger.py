@@ -1,26 +1,132 @@
 #!/usr/bin/env python3
 """
 Bambu Lab Print Logger
-Automatically logs print data to Excel using local REST API calls.
+Automatically logs print data to a CSV file (exported to Excel) using local REST API calls.
 LAN-only version for direct printer communication.
 """
 
+import csv
+import importlib.util
+import ipaddress
 import json
 import time
 import sys
 import argparse
+import operator
+import queue
 import requests
+import socket
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
-import pandas as pd
+from typing import Optional, Dict, Any, Union
 import os
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 
 # Disable SSL warnings for local printer connections
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Parse printer responses with the fastest available JSON library
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        json_loads = ujson.loads
+    except ImportError:
+        json_loads = json.loads
+
+def _to_float(value: Any) -> Optional[float]:
+    """Coerce a status value to float, or None if it isn't numeric"""
+    if isinstance(value, (int, float)):
+        return float(value)  # Common case: already numeric in the JSON
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    """Coerce a status value to str, or None if it is empty"""
+    return str(value) if value else None
+
+
+def _first_value(data: Dict[str, Any], keys: tuple, converter, default: Any) -> Any:
+    """Return the first of data[keys] that converts to a usable value, else default"""
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            value = converter(value)
+            if value is not None:
+                return value
+    return default
+
+
+# (output key, payload aliases in priority order, converter, default) for extract_print_data
+PRINT_FIELDS = (
+    ('progress', ('mc_percent', 'progress', 'percent'), _to_float, 0),
+    ('state', ('gcode_state', 'state', 'status'), _to_str, ''),
+    ('gcode_file', ('gcode_file', 'filename', 'file'), _to_str, ''),
+    ('bed_temp', ('bed_temper', 'bed_temp', 'bed_temperature'), _to_float, 0.0),
+    ('nozzle_temp', ('nozzle_temper', 'nozzle_temp', 'nozzle_temperature'), _to_float, 0.0),
+    ('remaining_time', ('mc_remaining_time', 'remaining_time', 'time_remaining'), _to_float, 0),
+    ('start_time', ('gcode_start_time', 'start_time', 'print_start_time'), _to_float, 0),
+)
+# Payload fields that name the loaded filament directly, checked before the AMS data
+FILAMENT_FIELDS = ('filament_type', 'material', 'filament')
+
+# Common printer data fields, any of which marks a usable status response
+PRINTER_DATA_FIELDS = frozenset({'print', 'status', 'state', 'progress', 'temperature'})
+
+# Queued after the last print log to shut the writer thread down
+_WRITER_STOP = object()
+
+# Printer states (upper-case, to match the normalized state in process_status_update)
+RUNNING_STATES = frozenset({'RUNNING', 'PRINTING'})
+TERMINAL_STATES = frozenset({'FINISH', 'FINISHED', 'FAILED', 'PAUSED', 'STOPPED'})
+FAIL_STATES = frozenset({'FAILED', 'STOPPED'})
+
+# Returned by get_printer_status when the payload matches the previous poll
+STATUS_UNCHANGED = object()
+
+# Status endpoints exposed by different printer firmwares
+STATUS_ENDPOINTS = ["/v1/status", "/api/v1/status", "/api/status", "/status"]
+
+# Excel libraries are imported on first use, so startup and the setup prompt don't pay for them.
+# xlsxwriter's constant_memory mode is the fastest way to write the Excel export.
+HAS_XLSXWRITER = importlib.util.find_spec("xlsxwriter") is not None
+HAS_LXML = importlib.util.find_spec("lxml") is not None
+
+# Column headers for the print log (CSV sidecar and Excel export)
+HEADERS = [
+    'Start Time', 'End Time', 'Print Duration', 'Duration (min)',
+    'G-code File', 'Filament Type', 'Filament Used (g)',
+    'Bed Temp (°C)', 'Nozzle Temp (°C)', 'Notes'
+]
+ROW_VALUES = operator.itemgetter(*HEADERS)  # Row dict -> tuple in column order
+NUMERIC_COLUMNS = ['Duration (min)', 'Filament Used (g)', 'Bed Temp (°C)', 'Nozzle Temp (°C)']
+
+
+# TCP keepalive for the polling connection: detect a dead printer link in ~1 minute
+KEEPALIVE_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+for _name, _value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3)):
+    if hasattr(socket, _name):  # Not available on every platform
+        KEEPALIVE_SOCKET_OPTIONS.append((socket.IPPROTO_TCP, getattr(socket, _name), _value))
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keepalive on pooled connections"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
 
 @dataclass
 class PrintLog:
@@ -36,23 +142,74 @@ class PrintLog:
     bed_temp: float = 0.0
     nozzle_temp: float = 0.0
 
+    def to_row(self) -> Dict[str, Any]:
+        """Return the entry as a log row keyed by column header"""
+        return {
+            'Start Time': self.start_time,
+            'End Time': self.end_time,
+            'Print Duration': self.print_duration,
+            'Duration (min)': self.duration_minutes,
+            'G-code File': self.gcode_file,
+            'Filament Type': self.filament_type,
+            'Filament Used (g)': self.filament_used_grams,
+            'Bed Temp (°C)': self.bed_temp,
+            'Nozzle Temp (°C)': self.nozzle_temp,
+            'Notes': self.notes
+        }
+
 
 class BambuLocalAPILogger:
     """Bambu Lab printer logger using local REST API"""
     
-    def __init__(self, bambu_ip: str, access_code: str, excel_file: str = "print_log.xlsx"):
+    # Fields read from extract_print_data() on every status update
+    _STATUS_FIELDS = operator.itemgetter(
+        'progress', 'state', 'gcode_file', 'bed_temp', 'nozzle_temp',
+        'remaining_time', 'filament_type', 'start_time'
+    )
+    
+    def __init__(self, bambu_ip: str, access_code: str, excel_file: str = "print_log.xlsx",
+                 probe_timeout: float = 2, poll_interval: float = 15):
         self.bambu_ip = bambu_ip
         self.access_code = access_code
         self.excel_file = excel_file
         
+        # Append-only CSV sidecar; the Excel file is re-exported from the log by the writer thread
+        self.csv_file = os.path.splitext(excel_file)[0] + ".csv"
+        self.csv_handle = None
+        self.csv_writer = None
+        
+        # Running totals and the last few prints for the summary; the CSV holds the full history
+        self._total_prints = 0
+        self._total_minutes = 0
+        self._total_filament = 0.0
+        self._recent_logs: "deque[Dict[str, Any]]" = deque(maxlen=3)
+        self._pending_rows = 0  # Rows logged since the Excel file was last written
+        
         # API configuration
         self.base_url = f"http://{bambu_ip}"  # Try HTTP first
         self.https_base_url = f"https://{bambu_ip}"  # Fallback to HTTPS
         self.use_https = False
+        self.status_endpoint: Optional[str] = None  # Found by test_connection
+        self.max_endpoint_failures = 3
+        self._endpoint_failures = 0
+        self.probe_timeout = probe_timeout  # Per-request timeout during the connection test
         
         # Session for connection reuse
         self.session = requests.Session()
         self.session.verify = False  # For local HTTPS connections
+        self.session.headers.update(self.get_headers())  # Sent with every request
+        # One printer host per protocol; a few connections for the parallel connection test.
+        # Retry briefly on gateway errors so one hiccup doesn't count as a failed poll. Connect
+        # errors and timeouts aren't retried (that would multiply every timeout), and a persistent
+        # error is returned as a response so get_printer_status() can count the failure.
+        adapter = KeepAliveAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, connect=0, read=0, status=2, backoff_factor=0.3,
+                              status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # Current print tracking
         self.print_start_time: Optional[datetime] = None
@@ -61,70 +218,110 @@ class BambuLocalAPILogger:
         self.last_progress = 0
         self.print_start_gcode_time: int = 0
         
-        # Print data collection
+        # Print data collection (last reported values, kept for polls that return STATUS_UNCHANGED)
         self.bed_temp = 0.0
         self.nozzle_temp = 0.0
+        self.printer_progress = 0
+        self.printer_state = "UNKNOWN"
         self.current_filament_type = ""
+        self._last_tray_now: Optional[str] = None
+        self._last_filament_type = "Unknown"
         
         # Polling control
         self.polling = False
-        self.poll_interval = 3  # seconds
+        self.poll_interval = poll_interval  # seconds, while a print is running
+        self.idle_poll_interval = 30  # Lower bound between polls while idle
+        self.fast_poll_interval = 3  # Upper bound near the end of a print, to catch the end time
+        # (connect, read) timeout for status polls; a dropped poll is harmless, the next one follows
+        self.poll_timeout = (2, 3)
         self.message_count = 0
+        self._wake = threading.Event()  # Set on print start/end to poll again without waiting
+        
+        # Console output throttling (seconds)
+        self.progress_redraw_interval = 0.5
+        self.idle_status_interval = 60
+        self._last_progress_print = 0.0
+        self._progress_line_open = False  # The progress line is drawn without a trailing newline
+        self._last_idle_print = 0.0
+        self._last_clock_s = -1
+        self._last_clock_str = ""
+        
+        # Hash of the last status payload, to spot polls where nothing changed
+        self._last_status_hash: Optional[int] = None
+        self._status_validators: Dict[str, str] = {}  # If-None-Match / If-Modified-Since headers
+        self._initial_status: Optional[Dict[str, Any]] = None  # From test_connection
         
         # Initialize Excel file
+        if not HAS_XLSXWRITER and not HAS_LXML:
+            print(" lxml not installed - Excel export will be slower (pip install lxml)")
         self.init_excel_file()
+        
+        # Completed prints are persisted by a background writer thread
+        self._write_q: "queue.Queue[PrintLog]" = queue.Queue()
+        self.write_batch_max_wait = 2.0  # seconds to wait for more prints before re-exporting Excel
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
 
     def test_connection(self) -> bool:
         """Test connection to local printer API"""
         print(f" Testing connection to {self.bambu_ip}...")
         
-        # Test both HTTP and HTTPS
+        # Check both ports at once so closed protocols are skipped without waiting on timeouts
+        open_ports = self.probe_ports([80, 443], self.probe_timeout)
+        if not open_ports:
+            print(f" No response on port 80 or 443")
+        
+        # Fire every protocol/endpoint combination at once and take the first usable answer
+        candidates = []
         for use_https in [False, True]:
+            if (443 if use_https else 80) not in open_ports:
+                continue
+            print(f" Trying {'HTTPS' if use_https else 'HTTP'} connection...")
             base_url = self.https_base_url if use_https else self.base_url
-            protocol = "HTTPS" if use_https else "HTTP"
-            
-            print(f" Trying {protocol} connection...")
-            
-            # Common API endpoints to try
-            endpoints = [
-                "/v1/status",
-                "/api/v1/status", 
-                "/api/status",
-                "/status"
-            ]
-            
-            for endpoint in endpoints:
+            candidates.extend((use_https, base_url, endpoint) for endpoint in STATUS_ENDPOINTS)
+        
+        pool = ThreadPoolExecutor(max_workers=4)
+        try:
+            futures = {
+                pool.submit(self.session.get, f"{base_url}{endpoint}", timeout=self.probe_timeout):
+                    (use_https, base_url, endpoint)
+                for use_https, base_url, endpoint in candidates
+            }
+            for future in as_completed(futures):
+                use_https, base_url, endpoint = futures[future]
+                protocol = "HTTPS" if use_https else "HTTP"
                 try:
-                    url = f"{base_url}{endpoint}"
-                    headers = self.get_headers()
-                    
-                    response = self.session.get(url, headers=headers, timeout=5)
+                    response = future.result()
+                except requests.exceptions.RequestException:
+                    continue  # Try next endpoint or protocol
+                
+                if response.status_code == 200:
+                    print(f" {protocol} connection successful on {endpoint}")
                     
-                    if response.status_code == 200:
-                        print(f" {protocol} connection successful on {endpoint}")
+                    # Verify we can get printer data
+                    try:
+                        data = json_loads(response.content)
+                    except ValueError:
+                        print(f" Connected but printer data format unexpected")
+                        continue
+                    if self.validate_printer_data(data):
+                        print(f" Printer data accessible")
                         self.base_url = base_url
                         self.use_https = use_https
+                        self.status_endpoint = endpoint
+                        # Use this response as the first poll instead of re-requesting it
+                        self._last_status_hash = hash(response.content)
+                        self._status_validators = self.get_validators(response)
+                        self._initial_status = data
+                        return True
+                    else:
+                        print(f" Connected but printer data format unexpected")
                         
-                        # Verify we can get printer data
-                        data = response.json()
-                        if self.validate_printer_data(data):
-                            print(f" Printer data accessible")
-                            return True
-                        else:
-                            print(f" Connected but printer data format unexpected")
-                            
-                    elif response.status_code == 401:
-                        print(f" Authentication failed on {endpoint} - check access code")
-                        
-                    elif response.status_code == 404:
-                        continue  # Try next endpoint
-                        
-                except requests.exceptions.ConnectionError:
-                    continue  # Try next endpoint or protocol
-                except requests.exceptions.Timeout:
-                    continue
-                except Exception as e:
-                    continue
+                elif response.status_code == 401:
+                    print(f" Authentication failed on {endpoint} - check access code")
+        finally:
+            # Don't wait on the probes still in flight once one has succeeded
+            pool.shutdown(wait=False, cancel_futures=True)
         
         print(f"Could not establish connection to {self.bambu_ip}")
         print(f"Possible issues:")
@@ -134,11 +331,23 @@ class BambuLocalAPILogger:
         print(f"    - Printer doesn't support API access")
         return False
 
+    def probe_ports(self, ports: list, timeout: float = 2) -> set:
+        """Return the ports accepting TCP connections, probing all of them in parallel"""
+        def is_open(port: int) -> bool:
+            try:
+                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(timeout)
+                    return sock.connect_ex((self.bambu_ip, port)) == 0
+            except OSError:
+                return False
+        
+        with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+            futures = {pool.submit(is_open, port): port for port in ports}
+            return {futures[f] for f in as_completed(futures) if f.result()}
+
     def validate_printer_data(self, data: Dict[str, Any]) -> bool:
         """Validate that we received expected printer data"""
-        # Look for common printer data fields
-        expected_fields = ['print', 'status', 'state', 'progress', 'temperature']
-        return any(field in data for field in expected_fields)
+        return not PRINTER_DATA_FIELDS.isdisjoint(data)
 
     def get_headers(self) -> Dict[str, str]:
         """Get headers for API requests"""
@@ -154,38 +363,74 @@ class BambuLocalAPILogger:
         
         return headers
 
-    def get_printer_status(self) -> Optional[Dict[str, Any]]:
-        """Get current printer status via local API"""
+    def get_printer_status(self) -> Union[Dict[str, Any], object, None]:
+        """Get current printer status via local API (STATUS_UNCHANGED if identical to the last poll)"""
         try:
-            # Try the working endpoint we found during connection test
-            endpoints = ["/v1/status", "/api/v1/status", "/api/status", "/status"]
+            # Use the endpoint found during the connection test; probe them all only to rediscover
+            endpoints = [self.status_endpoint] if self.status_endpoint else STATUS_ENDPOINTS
             
             for endpoint in endpoints:
                 url = f"{self.base_url}{endpoint}"
-                headers = self.get_headers()
+                # Conditional request: firmwares that send ETag/Last-Modified can answer 304 with no body
+                headers = self._status_validators if endpoint == self.status_endpoint else None
+                response = self.session.get(url, headers=headers, timeout=self.poll_timeout)
                 
-                response = self.session.get(url, headers=headers, timeout=3)
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
+                if response.status_code == 304:
+                    self._endpoint_failures = 0
+                    return STATUS_UNCHANGED
+                elif response.status_code == 200:
+                    self.status_endpoint = endpoint
+                    self._endpoint_failures = 0
+                    self._status_validators = self.get_validators(response)
+                    
+                    # Identical payloads are common between polls - skip re-parsing them
+                    content_hash = hash(response.content)
+                    if content_hash == self._last_status_hash:
+                        return STATUS_UNCHANGED
+                    
+                    # Parse the raw bytes directly, skipping the str decode of response.json()
+                    status = json_loads(response.content)
+                    self._last_status_hash = content_hash
+                    return status
+                elif response.status_code == 404 and not self.status_endpoint:
                     continue
                 else:
                     # Log error but continue trying
                     if self.message_count <= 3:
                         print(f"  API returned HTTP {response.status_code} for {endpoint}")
             
+            # Forget an endpoint that keeps failing so the next poll probes them all again
+            if self.status_endpoint:
+                self._endpoint_failures += 1
+                if self._endpoint_failures >= self.max_endpoint_failures:
+                    self.status_endpoint = None
+                    self._endpoint_failures = 0
+                    self._status_validators = {}
+            
             return None
             
         except requests.exceptions.RequestException as e:
             if self.message_count <= 3:
                 print(f" API request error: {e}")
             return None
+        except ValueError as e:
+            if self.message_count <= 3:
+                print(f" Invalid JSON from printer: {e}")
+            return None
         except Exception as e:
             if self.message_count <= 3:
                 print(f" Unexpected error: {e}")
             return None
 
+    def get_validators(self, response: requests.Response) -> Dict[str, str]:
+        """Build conditional request headers from a status response's cache validators"""
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        return validators
+
     def extract_print_data(self, status_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract print information from status data"""
         if not status_data:
@@ -194,15 +439,10 @@ class BambuLocalAPILogger:
         # Handle different possible API response formats
         print_data = status_data.get('print', status_data)
         
-        # Extract basic print information
+        # Extract basic print information, probing only the known aliases of each field
         extracted = {
-            'progress': self.safe_get_numeric(print_data, ['mc_percent', 'progress', 'percent'], 0),
-            'state': self.safe_get_string(print_data, ['gcode_state', 'state', 'status'], ''),
-            'gcode_file': self.safe_get_string(print_data, ['gcode_file', 'filename', 'file'], ''),
-            'bed_temp': self.safe_get_numeric(print_data, ['bed_temper', 'bed_temp', 'bed_temperature'], 0.0),
-            'nozzle_temp': self.safe_get_numeric(print_data, ['nozzle_temper', 'nozzle_temp', 'nozzle_temperature'], 0.0),
-            'remaining_time': self.safe_get_numeric(print_data, ['mc_remaining_time', 'remaining_time', 'time_remaining'], 0),
-            'start_time': self.safe_get_numeric(print_data, ['gcode_start_time', 'start_time', 'print_start_time'], 0)
+            out_key: _first_value(print_data, aliases, converter, default)
+            for out_key, aliases, converter, default in PRINT_FIELDS
         }
         
         # Extract filament information
@@ -211,65 +451,143 @@ class BambuLocalAPILogger:
         
         return extracted
 
-    def safe_get_numeric(self, data: Dict[str, Any], keys: list, default: float = 0.0) -> float:
-        """Get numeric value from data using multiple possible keys"""
-        for key in keys:
-            if key in data:
-                try:
-                    return float(data[key])
-                except (ValueError, TypeError):
-                    continue
-        return default
-
-    def safe_get_string(self, data: Dict[str, Any], keys: list, default: str = '') -> str:
-        """Get string value from data using multiple possible keys"""
-        for key in keys:
-            if key in data and data[key]:
-                return str(data[key])
-        return default
-
     def extract_filament_info(self, ams_data: Dict[str, Any], print_data: Dict[str, Any]) -> str:
         """Extract filament type from AMS data or print data"""
-        try:
-            # Try to get from direct filament field first
-            filament_direct = self.safe_get_string(print_data, ['filament_type', 'material', 'filament'], '')
-            if filament_direct:
-                return filament_direct
+        # Try to get from direct filament field first
+        filament_direct = _first_value(print_data, FILAMENT_FIELDS, _to_str, '')
+        if filament_direct:
+            return filament_direct
+        
+        # Try to extract from AMS data
+        if isinstance(ams_data, dict) and "ams" in ams_data:
+            current_tray = ams_data.get("tray_now", "0")
             
-            # Try to extract from AMS data
-            if ams_data and "ams" in ams_data:
-                current_tray = ams_data.get("tray_now", "0")
-                
-                try:
-                    tray_num = int(current_tray)
-                    ams_index = tray_num // 4
-                    tray_index = tray_num % 4
-                except:
-                    return "Unknown"
-                
-                ams_list = ams_data.get("ams", [])
-                if ams_index < len(ams_list):
-                    trays = ams_list[ams_index].get("tray", [])
-                    if tray_index < len(trays):
-                        return trays[tray_index].get("tray_type", "Unknown")
+            # The loaded tray doesn't change mid-print, so reuse the last lookup
+            if self.is_printing and current_tray == self._last_tray_now:
+                return self._last_filament_type
+            
+            # Firmware sends the tray as a digit string (or int); anything else is unknown
+            if isinstance(current_tray, int) and current_tray >= 0:
+                tray_num = current_tray
+            elif isinstance(current_tray, str) and current_tray.isdigit():
+                tray_num = int(current_tray)
+            else:
+                return "Unknown"
+            ams_index, tray_index = divmod(tray_num, 4)
             
-            return "Unknown"
-        except Exception:
-            return "Unknown"
+            filament_type = "Unknown"
+            ams_list = ams_data.get("ams")
+            if isinstance(ams_list, list) and ams_index < len(ams_list) and isinstance(ams_list[ams_index], dict):
+                trays = ams_list[ams_index].get("tray")
+                if isinstance(trays, list) and tray_index < len(trays) and isinstance(trays[tray_index], dict):
+                    filament_type = trays[tray_index].get("tray_type", "Unknown")
+            
+            # Only cache a resolved type: an early status may not include the tray data yet
+            if filament_type and filament_type != "Unknown":
+                self._last_tray_now = current_tray
+                self._last_filament_type = filament_type
+            return filament_type
+        
+        return "Unknown"
 
     def init_excel_file(self):
-        """Initialize Excel file with headers if it doesn't exist"""
-        if not os.path.exists(self.excel_file):
-            df = pd.DataFrame(columns=[
-                'Start Time', 'End Time', 'Print Duration', 'Duration (min)',
-                'G-code File', 'Filament Type', 'Filament Used (g)', 
-                'Bed Temp (°C)', 'Nozzle Temp (°C)', 'Notes'
-            ])
-            df.to_excel(self.excel_file, index=False)
-            print(f" Created new Excel file: {self.excel_file}")
+        """Initialize the CSV log (seeded from an existing Excel file) and the Excel file"""
+        excel_mtime = os.stat(self.excel_file).st_mtime if os.path.exists(self.excel_file) else None
+        csv_exists = os.path.exists(self.csv_file)
+        
+        rows = []
+        if csv_exists:
+            print(f" Using existing log file: {self.csv_file}")
+            try:
+                for row in self._iter_log_rows():
+                    self._record_row(row)
+            except KeyError as e:
+                print(f" Could not read log file {self.csv_file}: missing column {e}")
+                print(f" Restore the original column headers and restart the logger")
+                sys.exit(1)
+            except (UnicodeDecodeError, csv.Error) as e:
+                # Usually the CSV was re-saved by a spreadsheet in another encoding
+                print(f" Could not read log file {self.csv_file}: {e}")
+                print(f" Save it again as 'CSV UTF-8' and restart the logger")
+                sys.exit(1)
+        elif excel_mtime is not None:
+            # One-time migration of prints logged before the CSV sidecar existed. Done before the
+            # CSV is created, so a failed import is retried next run instead of wiping the workbook
+            try:
+                rows = self._read_legacy_xlsx()
+            except Exception as e:
+                print(f" Could not import existing Excel file: {e}")
+                print(f" {self.excel_file} was left untouched - fix the problem and restart the logger")
+                sys.exit(1)
+        
+        # Long-lived handle so each print is a single append
+        self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
+        self.csv_writer = csv.writer(self.csv_handle)
+        
+        if not csv_exists:
+            # Write the header through the append handle; the rows are already in memory
+            self.csv_writer.writerow(HEADERS)
+            self.csv_writer.writerows(rows)
+            self.csv_handle.flush()
+            for row in rows:
+                self._record_row(self._parse_log_row(dict(zip(HEADERS, row))))
+            if excel_mtime is not None:
+                # The workbook already holds every migrated row; match its mtime so the next
+                # startup doesn't take the new CSV for prints that were never exported
+                os.utime(self.csv_file, (excel_mtime, excel_mtime))
+            print(f" Created new log file: {self.csv_file}")
+        
+        if excel_mtime is None:
+            if self._flush_xlsx():
+                print(f" Created new Excel file: {self.excel_file}")
+        elif csv_exists and os.stat(self.csv_file).st_mtime > excel_mtime:
+            # A previous run logged prints but exited before exporting them
+            if self._flush_xlsx():
+                print(f" Updated Excel file from log: {self.excel_file}")
         else:
             print(f" Using existing Excel file: {self.excel_file}")
 
+    def _read_legacy_xlsx(self) -> list:
+        """Read logged prints from an existing Excel file in one streaming pass"""
+        import openpyxl
+        wb = openpyxl.load_workbook(self.excel_file, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            result = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue  # Read-only mode returns formatted-but-empty rows too
+                values = dict(zip(header, row))
+                result.append(["" if values.get(h) is None else values[h] for h in HEADERS])
+            return result
+        finally:
+            wb.close()
+
+    def _iter_log_rows(self):
+        """Yield the rows of the CSV log one at a time, with numeric columns converted"""
+        # utf-8-sig also reads the byte order mark Excel adds when it saves a CSV as UTF-8
+        with open(self.csv_file, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                yield self._parse_log_row(row)
+
+    def _record_row(self, row: Dict[str, Any]):
+        """Add a log row to the running summary totals"""
+        self._total_prints += 1
+        self._total_minutes += row['Duration (min)']
+        self._total_filament += row['Filament Used (g)']
+        self._recent_logs.append(row)
+
+    def _parse_log_row(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Convert the numeric columns of a CSV log row back from strings"""
+        for column in NUMERIC_COLUMNS:
+            try:
+                row[column] = float(row[column])
+            except (ValueError, TypeError):
+                row[column] = 0.0
+        row['Duration (min)'] = int(row['Duration (min)'])
+        return row
+
     def start_print_tracking(self, gcode_file: str, gcode_start_time: int, filament_type: str):
         """Start tracking a new print"""
         self.is_printing = True
@@ -286,29 +604,37 @@ class BambuLocalAPILogger:
         print(f"  Bed: {self.bed_temp}°C | Nozzle: {self.nozzle_temp}°C")
         print("="*60)
 
-    def update_progress(self, progress: int, remaining_time: int):
-        """Update progress display"""
+    def update_progress(self, progress: int, remaining_time: int, current_time: str) -> bool:
+        """Update progress display (redrawn at most every progress_redraw_interval); True if drawn"""
+        now = time.monotonic()
+        if progress < 100 and now - self._last_progress_print < self.progress_redraw_interval:
+            return False
+        self._last_progress_print = now
+        self._progress_line_open = True
+        
         remaining_str = f"{remaining_time}min" if remaining_time > 0 else "Unknown"
-        current_time = datetime.now().strftime('%H:%M:%S')
         filament_str = self.current_filament_type if self.current_filament_type else "Unknown"
         print(f"\r [{current_time}] Progress: {progress:3d}% | Remaining: {remaining_str:>8} | {filament_str}", end="", flush=True)
+        return True
 
     def end_print_tracking(self, failed: bool = False):
-        """End print tracking and log to Excel"""
+        """End print tracking and log to the CSV log"""
         if not self.is_printing or not self.print_start_time:
             return
         
         self.is_printing = False
         end_time = datetime.now()
+        end_time_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
         duration = end_time - self.print_start_time
-        duration_minutes = int(duration.total_seconds() / 60)
+        duration_minutes = (duration.days * 86400 + duration.seconds) // 60
         
         status_emoji = "" if failed else ""
         status_text = "FAILED" if failed else "COMPLETED"
         
         print(f"\n" + "="*60)
+        self._progress_line_open = False
         print(f"{status_emoji} PRINT {status_text}")
-        print(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"End Time: {end_time_str}")
         print(f"Duration: {self.format_duration(duration_minutes)}")
         
         # Estimate filament usage (rough calculation based on print time)
@@ -317,7 +643,7 @@ class BambuLocalAPILogger:
         # Create log entry
         log_entry = PrintLog(
             start_time=self.print_start_time.strftime('%Y-%m-%d %H:%M:%S'),
-            end_time=end_time.strftime('%Y-%m-%d %H:%M:%S'),
+            end_time=end_time_str,
             print_duration=self.format_duration(duration_minutes),
             duration_minutes=duration_minutes,
             gcode_file=os.path.basename(self.current_gcode_file) if self.current_gcode_file else "Unknown",
@@ -328,15 +654,15 @@ class BambuLocalAPILogger:
             notes="FAILED PRINT" if failed else ""
         )
         
-        # Save to Excel
-        self.save_to_excel(log_entry)
-        
-        print(f"Logged to Excel: {self.excel_file}")
-        print(f"Manual updates recommended:")
+        print(f"Manual updates recommended (edit {self.csv_file}; {self.excel_file} is regenerated from it):")
         print(f"    - Verify filament used (estimated: {estimated_filament:.1f}g)")
         print(f"    - Add notes about print quality/issues")
         print("="*60)
         print("Waiting for next print...")
+        
+        # Hand off to the writer thread so polling is never blocked on disk I/O; it reports the
+        # write, so queue the entry after this block to keep the console output in one piece
+        self._write_q.put(log_entry)
 
     def estimate_filament_usage(self, duration_minutes: int) -> float:
         """Rough estimate of filament usage based on print time"""
@@ -352,55 +678,122 @@ class BambuLocalAPILogger:
         else:
             return f"{mins}m"
 
-    def save_to_excel(self, log_entry: PrintLog):
-        """Save print log to Excel file"""
+    def current_clock(self) -> str:
+        """Current time of day as HH:MM:SS, formatted at most once per second"""
+        now_s = int(time.time())
+        if now_s != self._last_clock_s:
+            self._last_clock_s = now_s
+            self._last_clock_str = time.strftime('%H:%M:%S', time.localtime(now_s))
+        return self._last_clock_str
+
+    def save_to_excel(self, log_entries: list) -> bool:
+        """Append print logs to the CSV log and the summary totals; True if they were written"""
         try:
-            # Read existing data
-            try:
-                df = pd.read_excel(self.excel_file)
-            except:
-                df = pd.DataFrame()
+            new_rows = [log_entry.to_row() for log_entry in log_entries]
+            for row in new_rows:
+                self._record_row(row)
             
-            # Create new row
-            new_row = {
-                'Start Time': log_entry.start_time,
-                'End Time': log_entry.end_time,
-                'Print Duration': log_entry.print_duration,
-                'Duration (min)': log_entry.duration_minutes,
-                'G-code File': log_entry.gcode_file,
-                'Filament Type': log_entry.filament_type,
-                'Filament Used (g)': log_entry.filament_used_grams,
-                'Bed Temp (°C)': log_entry.bed_temp,
-                'Nozzle Temp (°C)': log_entry.nozzle_temp,
-                'Notes': log_entry.notes
-            }
-            
-            # Add new row
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+            self.csv_writer.writerows(ROW_VALUES(row) for row in new_rows)
+            self.csv_handle.flush()
+            self._pending_rows += len(new_rows)
+            return True
             
-            # Save to Excel
-            df.to_excel(self.excel_file, index=False)
+        except (OSError, ValueError, csv.Error) as e:
+            print(f" Error saving to log: {e}")
+            return False
+
+    def _writer_loop(self):
+        """Append queued print logs to the CSV as they arrive, re-exporting Excel once per burst"""
+        stop = False
+        while not stop:
+            entries = [self._write_q.get()]
+            export_deadline = time.monotonic() + self.write_batch_max_wait
+            while True:
+                # Write everything already queued straight away - a print is on disk as soon as
+                # the writer gets to it, and only the Excel export waits for the burst to end
+                while entries[-1] is not _WRITER_STOP:
+                    try:
+                        entries.append(self._write_q.get_nowait())
+                    except queue.Empty:
+                        break
+                if entries[-1] is _WRITER_STOP:
+                    stop = True
+                    entries.pop()
+                if entries and self.save_to_excel(entries):
+                    print(f"Logged to: {self.csv_file}\n", end="")  # One write, whole line
+                if stop:
+                    break
+                
+                # Wait briefly for more prints so close completions share one Excel export
+                try:
+                    entries = [self._write_q.get(timeout=max(0.0, export_deadline - time.monotonic()))]
+                except queue.Empty:
+                    break
             
+            if self._pending_rows:
+                # Re-export while we're off the polling thread so the workbook stays current
+                self._flush_xlsx()
+
+    def _stop_writer(self):
+        """Stop the writer thread after it has saved all queued print logs"""
+        if self._writer_thread.is_alive():
+            self._write_q.put(_WRITER_STOP)
+            self._writer_thread.join()
+
+    def _flush_xlsx(self) -> bool:
+        """Write the Excel export from the CSV log, streaming rows through; True if it was written
+
+        The export is overwritten every time, so edits belong in the CSV log.
+        """
+        try:
+            if HAS_XLSXWRITER:
+                import xlsxwriter
+                # constant_memory flushes each row as it is written; rows must go in order
+                wb = xlsxwriter.Workbook(self.excel_file, {'constant_memory': True})
+                ws = wb.add_worksheet("Prints")
+                ws.write_row(0, 0, HEADERS)
+                for row_num, row in enumerate(self._iter_log_rows(), start=1):
+                    ws.write_row(row_num, 0, ROW_VALUES(row))
+                wb.close()
+            else:
+                import openpyxl
+                wb = openpyxl.Workbook(write_only=True)
+                ws = wb.create_sheet("Prints")
+                ws.append(HEADERS)
+                for row in self._iter_log_rows():
+                    ws.append(ROW_VALUES(row))
+                wb.save(self.excel_file)
+            self._pending_rows = 0
+            return True
         except Exception as e:
             print(f" Error saving to Excel: {e}")
+            return False
 
     def monitor_prints(self):
         """Main monitoring loop"""
         print(f"Starting print monitoring...")
-        print(f"Polling every {self.poll_interval} seconds")
+        print(f"Polling every {self.poll_interval} seconds while printing "
+              f"({max(self.poll_interval, self.idle_poll_interval)} seconds while idle)")
         print("Waiting for prints to start...\n")
         
         consecutive_errors = 0
         max_errors = 10
         
         while self.polling:
+            poll_started = time.monotonic()
             try:
-                # Get printer status
-                status = self.get_printer_status()
+                # Get printer status (the connection test already fetched the first one)
+                status = self._initial_status or self.get_printer_status()
+                self._initial_status = None
                 
-                if status:
+                if status is STATUS_UNCHANGED:
+                    consecutive_errors = 0  # Printer answered, nothing new to process
+                    self.show_update_confirmation()
+                    self.show_idle_status()
+                elif status:
                     consecutive_errors = 0  # Reset error counter
                     self.process_status_update(status)
+                    self.show_idle_status()
                 else:
                     consecutive_errors += 1
                     if consecutive_errors >= max_errors:
@@ -410,8 +803,8 @@ class BambuLocalAPILogger:
                 
                 self.message_count += 1
                 
-                # Sleep between polls
-                time.sleep(self.poll_interval)
+                # Sleep until the next poll is due
+                self._sleep_until_next_poll(poll_started)
                 
             except KeyboardInterrupt:
                 break
@@ -420,53 +813,80 @@ class BambuLocalAPILogger:
                 consecutive_errors += 1
                 if consecutive_errors >= max_errors:
                     break
-                time.sleep(self.poll_interval)
+                self._sleep_until_next_poll(poll_started)
+
+    def _sleep_until_next_poll(self, poll_started: float):
+        """Sleep for what's left of the poll interval, so request time doesn't stretch the cadence"""
+        remaining = self.next_poll_interval() - (time.monotonic() - poll_started)
+        if remaining > 0:
+            self._wake.wait(remaining)
+        self._wake.clear()
+
+    def next_poll_interval(self) -> float:
+        """Pick the delay between polls based on what the printer is doing"""
+        if not self.is_printing:
+            return max(self.poll_interval, self.idle_poll_interval)
+        if self.last_progress >= 95:
+            return min(self.poll_interval, self.fast_poll_interval)
+        return self.poll_interval
 
     def process_status_update(self, status_data: Dict[str, Any]):
         """Process a status update from the printer"""
         print_data = self.extract_print_data(status_data)
+        current_time = self.current_clock()
         
-        progress = int(print_data.get('progress', 0))
-        state = print_data.get('state', '').upper()
-        gcode_file = print_data.get('gcode_file', '')
-        bed_temp = print_data.get('bed_temp', 0.0)
-        nozzle_temp = print_data.get('nozzle_temp', 0.0)
-        remaining_time = int(print_data.get('remaining_time', 0))
-        filament_type = print_data.get('filament_type', 'Unknown')
-        start_time = int(print_data.get('start_time', 0))
+        # extract_print_data() always fills every key, so no per-key defaults are needed
+        (progress, state, gcode_file, bed_temp, nozzle_temp,
+         remaining_time, filament_type, start_time) = self._STATUS_FIELDS(print_data)
+        progress = int(progress)
+        state = state.upper()
+        remaining_time = int(remaining_time)
+        start_time = int(start_time)
         
-        # Update current temperatures
+        # Update current printer readings
         self.bed_temp = bed_temp
         self.nozzle_temp = nozzle_temp
+        self.printer_progress = progress
+        self.printer_state = state
         
-        # Show confirmation of data reception (only first few times)
-        if self.message_count <= 3:
-            print(f"Update #{self.message_count}: Progress: {progress}%, State: {state}")
-            if self.message_count == 3:
-                print(f"API polling working - switching to print monitoring mode")
+        self.show_update_confirmation()
         
         # Check if print is starting
-        if not self.is_printing and state in ['RUNNING', 'PRINTING'] and progress > 0:
+        if not self.is_printing and state in RUNNING_STATES and progress > 0:
             self.start_print_tracking(gcode_file, start_time, filament_type)
+            self._wake.set()
         
         # Check if print is completed or failed
-        elif self.is_printing and (progress >= 100 or state in ['FINISH', 'FINISHED', 'FAILED', 'PAUSED', 'STOPPED']):
-            failed = state in ['FAILED', 'STOPPED']
+        elif self.is_printing and (progress >= 100 or state in TERMINAL_STATES):
+            failed = state in FAIL_STATES
             self.end_print_tracking(failed)
+            self._wake.set()
         
-        # Update progress for current print
+        # Update progress for current print; a throttled value is drawn on a later update
         if self.is_printing and progress != self.last_progress:
-            self.update_progress(progress, remaining_time)
-            self.last_progress = progress
+            if self.update_progress(progress, remaining_time, current_time):
+                self.last_progress = progress
         
         # Update filament type if we got better info
         if filament_type != "Unknown":
             self.current_filament_type = filament_type
         
-        # Show periodic status updates when not printing
-        if not self.is_printing and self.message_count % 20 == 0:  # Every ~1 minute
-            current_time = datetime.now().strftime('%H:%M:%S')
-            print(f"💤 [{current_time}] Idle - Bed: {bed_temp}°C | Nozzle: {nozzle_temp}°C | State: {state}")
+    def show_update_confirmation(self):
+        """Show confirmation of data reception (only first few times) from the last known readings"""
+        if self.message_count <= 3:
+            # Don't append to the progress line
+            newline = "\n" if self._progress_line_open else ""
+            self._progress_line_open = False
+            print(f"{newline}Update #{self.message_count}: Progress: {self.printer_progress}%, State: {self.printer_state}")
+            if self.message_count == 3:
+                print(f"API polling working - switching to print monitoring mode")
+
+    def show_idle_status(self):
+        """Show periodic status updates when not printing, including on unchanged polls"""
+        if not self.is_printing and time.monotonic() - self._last_idle_print >= self.idle_status_interval:
+            self._last_idle_print = time.monotonic()
+            print(f"💤 [{self.current_clock()}] Idle - Bed: {self.bed_temp}°C | Nozzle: {self.nozzle_temp}°C "
+                  f"| State: {self.printer_state}")
 
     def run(self):
         """Start the logging process"""
@@ -485,7 +905,7 @@ class BambuLocalAPILogger:
             
             print(f"\nStarting print logger...")
             print(f"Monitoring: {self.bambu_ip}")
-            print(f"Excel file: {self.excel_file}")
+            print(f"Print log: {self.csv_file} (edit this file - {self.excel_file} is overwritten on export)")
             
             # Start monitoring
             self.polling = True
@@ -493,32 +913,33 @@ class BambuLocalAPILogger:
             
         except KeyboardInterrupt:
             print("\n\nStopping logger...")
+            self._stop_writer()
             self.display_summary()
         except Exception as e:
             print(f"Fatal error: {e}")
         finally:
             self.polling = False
+            self._stop_writer()
+            # Export on every exit path, but only rewrite the workbook if something was logged
+            if self._pending_rows:
+                self._flush_xlsx()
+            if self.csv_handle:
+                self.csv_handle.close()
 
     def display_summary(self):
         """Display current session summary"""
-        try:
-            df = pd.read_excel(self.excel_file)
-            if len(df) > 0:
-                total_prints = len(df)
-                total_minutes = df['Duration (min)'].sum()
-                total_filament = df['Filament Used (g)'].sum()
-                
-                print(f"\nSESSION SUMMARY:")
-                print(f"    Total prints logged: {total_prints}")
-                print(f"    Total print time: {self.format_duration(int(total_minutes))}")
-                print(f"    Total filament used: {total_filament:.1f}g")
-                
-                if total_prints > 0:
-                    print(f"\nRecent prints:")
-                    for _, row in df.tail(3).iterrows():
-                        print(f"   • {row['G-code File']} - {row['Print Duration']} ({row['Filament Type']})")
-        except:
+        if not self._total_prints:
             print("No previous prints found")
+            return
+        
+        print(f"\nSESSION SUMMARY:")
+        print(f"    Total prints logged: {self._total_prints}")
+        print(f"    Total print time: {self.format_duration(int(self._total_minutes))}")
+        print(f"    Total filament used: {self._total_filament:.1f}g")
+        
+        print(f"\nRecent prints:")
+        for row in self._recent_logs:
+            print(f"   • {row['G-code File']} - {row['Print Duration']} ({row['Filament Type']})")
 
 
 def get_printer_info():
@@ -532,19 +953,11 @@ def get_printer_info():
             print("IP address cannot be empty")
             continue
         
-        # Basic IP validation
-        parts = ip.split('.')
-        if len(parts) != 4:
-            print("Invalid IP format. Use format: 192.168.1.100")
-            continue
-        
         try:
-            for part in parts:
-                if not (0 <= int(part) <= 255):
-                    raise ValueError
+            ipaddress.IPv4Address(ip)
             break
         except ValueError:
-            print("Invalid IP address. Each number must be 0-255")
+            print("Invalid IP address. Use format: 192.168.1.100")
             continue
     
     while True:
@@ -563,12 +976,27 @@ def get_printer_info():
     return ip, access_code, excel_file
 
 
+def positive_float(value: str) -> float:
+    """argparse type for options that must be a number of seconds greater than zero"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a number")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(description="Log Bambu Lab prints to Excel using local API")
     parser.add_argument("--ip", help="IP address of the Bambu Lab printer")
     parser.add_argument("--code", help="Printer access code")
     parser.add_argument("--excel", "-e", default="print_log.xlsx", 
-                       help="Excel file name (default: print_log.xlsx)")
+                       help="Excel export file name; prints are logged to a CSV beside it (default: print_log.xlsx)")
+    parser.add_argument("--probe-timeout", type=float, default=2,
+                       help="Seconds to wait per request during the connection test (default: 2)")
+    parser.add_argument("--poll-interval", type=positive_float, default=15,
+                       help="Seconds between status polls while printing (default: 15)")
     
     args = parser.parse_args()
     
@@ -578,7 +1006,8 @@ def main():
     else:
         ip, access_code, excel_file = args.ip, args.code, args.excel
     
-    logger = BambuLocalAPILogger(ip, access_code, excel_file)
+    logger = BambuLocalAPILogger(ip, access_code, excel_file, probe_timeout=args.probe_timeout,
+                                 poll_interval=args.poll_interval)
     logger.run()
 
 